@@ -0,0 +1,170 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Small caches: exact LRU, embedding-similarity, persisted embeddings
+# ---------------------------------------------------------------------------
+
+
+def content_key(*parts: str) -> str:
+    """Stable SHA-256 key for one or more strings."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe exact-match LRU cache keyed by string."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SimilarityCache:
+    """
+    Approximate cache keyed by embedding vectors.
+
+    A lookup returns the value of the most similar stored key if its cosine
+    similarity is at least `threshold`. Keys live in one preallocated matrix,
+    so a lookup is a single matrix-vector product. When full, the least
+    recently used entry is replaced.
+    """
+
+    def __init__(self, maxsize: int = 256, threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._keys: Optional[np.ndarray] = None  # (maxsize, dim), unit rows
+        self._values: List[Any] = []
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def get(self, vector: Sequence[float]) -> Optional[Any]:
+        q = self._normalize(vector)
+        with self._lock:
+            n = len(self._values)
+            if n == 0 or self._keys.shape[1] != q.shape[0]:
+                return None
+            sims = self._keys[:n] @ q
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            self._tick += 1
+            self._last_used[best] = self._tick
+            return self._values[best]
+
+    def put(self, vector: Sequence[float], value: Any) -> None:
+        q = self._normalize(vector)
+        with self._lock:
+            if self._keys is None or self._keys.shape[1] != q.shape[0]:
+                self._keys = np.zeros((self.maxsize, q.shape[0]), dtype=np.float32)
+                self._values = []
+            n = len(self._values)
+            if n < self.maxsize:
+                slot = n
+                self._values.append(value)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._values[slot] = value
+            self._keys[slot] = q
+            self._tick += 1
+            self._last_used[slot] = self._tick
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors keyed by content hash: an in-memory LRU in front of an
+    optional SQLite file, so hits survive process restarts.
+    """
+
+    def __init__(self, maxsize: int = 4096, path: Optional[Path] = None):
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path is not None:
+            try:
+                self._conn = sqlite3.connect(str(path), check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Embedding cache disabled on disk: {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None or self._conn is None:
+            return vector
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Embedding cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        vector = array("d", row[0]).tolist()
+        self._memory.put(key, vector)
+        return vector
+
+    def put_many(self, items: Sequence[Tuple[str, List[float]]]) -> None:
+        for key, vector in items:
+            self._memory.put(key, vector)
+        if self._conn is None or not items:
+            return
+        # The disk tier is best effort (e.g. "database is locked" with several
+        # workers); the vectors are already in memory, so never raise here.
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, array("d", vector).tobytes()) for key, vector in items],
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding cache write failed: {e}")
+            with self._lock:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
@@ -1,23 +1,103 @@
-from typing import Generator
+import asyncio
+import os
+from typing import AsyncGenerator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
-DATABASE_URL = "sqlite:///./skillbot.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./skillbot.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite + FastAPI
-)
+# Pool settings (env-overridable). pre_ping + recycle drop dead/stale
+# connections before use, which matters once this points at a cloud DB.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+_engine_kwargs = {"pool_pre_ping": True, "pool_recycle": POOL_RECYCLE}
+if ":memory:" not in DATABASE_URL:
+    # In-memory SQLite uses a single static connection; no sizing applies.
+    _engine_kwargs.update(
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_async_engine(DATABASE_URL, **_engine_kwargs)
+
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    autoflush=False,
+    expire_on_commit=False,  # keep attributes readable after commit (no lazy IO)
+)
 
 Base = declarative_base()
 
 
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# Copy skills of turns stored before turn_skills existed (full-key
+# skills_json entries) into turn_skills. Turns that already have rows are
+# skipped (indexed lookup on turn_skills.turn_id), so it is idempotent.
+BACKFILL_TURN_SKILLS_SQL = text(
+    """
+    INSERT INTO turn_skills (turn_id, session_id, name, category, confidence, created_at)
+    SELECT
+        c.id,
+        c.session_id,
+        TRIM(json_extract(j.value, '$.name')),
+        TRIM(COALESCE(json_extract(j.value, '$.category'), '')),
+        COALESCE(json_extract(j.value, '$.confidence'), 0.0),
+        c.created_at
+    FROM conversation_turns AS c, json_each(c.skills_json) AS j
+    WHERE NOT EXISTS (SELECT 1 FROM turn_skills AS t WHERE t.turn_id = c.id)
+      AND TRIM(COALESCE(json_extract(j.value, '$.name'), '')) != ''
+    """
+)
+
+
+# SQLite PRAGMA user_version once the turn_skills backfill has run, so later
+# starts skip it instead of rescanning every turn.
+TURN_SKILLS_BACKFILLED_VERSION = 1
+
+
+async def init_db() -> None:
+    """Create tables that do not exist yet and backfill turn_skills (once)."""
+    from . import models  # noqa: F401  (registers tables on Base.metadata)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name != "sqlite":
+            return
+        version = (await conn.execute(text("PRAGMA user_version"))).scalar_one()
+        if version >= TURN_SKILLS_BACKFILLED_VERSION:
+            return
+        # create_all does not add indexes to an already existing turn_skills.
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_turn_skills_turn_id ON turn_skills (turn_id)")
+        )
+        await conn.execute(BACKFILL_TURN_SKILLS_SQL)
+        await conn.execute(text(f"PRAGMA user_version = {TURN_SKILLS_BACKFILLED_VERSION}"))
+
+
+async def warm_pool(connections: int = 4) -> None:
+    """Open a few pooled connections up front so first requests skip connect."""
+
+    async def _ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(_ping() for _ in range(min(connections, POOL_SIZE))))
+
+
+if __name__ == "__main__":
+    # One-shot schema setup: `python -m app.db` (run before starting workers).
+    # Run as __main__, this file is a second copy of the module; models register
+    # on app.db.Base, so use that module's init_db (and engine), not ours.
+    from app.db import init_db as _init_db
+
+    asyncio.run(_init_db())
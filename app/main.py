@@ -1,19 +1,20 @@
+import asyncio
+import os
 import uuid
 import datetime as dt
-from typing import List, Optional, Dict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db import Base, engine, get_db
-from .models import ConversationTurn
-from .rag import analyze_message, get_vectorstore
-
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+from .db import get_db, init_db, warm_pool
+from .models import ConversationTurn, TurnSkill
+from .rag import SKILL_CONFIG, analyze_message, get_vectorstore
+from .roles import infer_roles_from_skill_names
 
 app = FastAPI(title="Skill Finder Chatbot", version="0.2.0")
 
@@ -57,6 +58,11 @@ class TurnOut(BaseModel):
     created_at: dt.datetime
 
 
+class ConversationPage(BaseModel):
+    turns: List[TurnOut]
+    next_after_id: Optional[int] = None
+
+
 # --- New models for profile endpoint ---
 
 class SkillCount(BaseModel):
@@ -95,10 +101,16 @@ class MatchResult(BaseModel):
 # -------------------------
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
+    # Tables are normally created once by `python -m app.db` before the
+    # workers start; RUN_CREATE_ALL=1 opts back into doing it here.
+    if os.getenv("RUN_CREATE_ALL") == "1":
+        await init_db()
+    await warm_pool()
+
     # Ensure vectorstore is ready on startup (lazy load also works)
     try:
-        get_vectorstore()
+        await asyncio.to_thread(get_vectorstore)
     except Exception as e:
         print(f"Error initializing vectorstore: {e}")
 
@@ -107,34 +119,84 @@ def startup_event():
 # Helper functions
 # -------------------------
 
-def infer_roles_from_skill_names(skill_names: List[str]) -> List[str]:
-    """Very simple heuristics to infer possible roles from skill names."""
-    names = set(skill_names)
-    roles: List[str] = []
+# Per-skill stats for a session from turn_skills. Always returns at least one
+# row so total_turns is known even when no skills were found (name is NULL
+# then).
+PROFILE_STATS_SQL = text(
+    """
+    SELECT t.total_turns, s.name, s.category, s.count, s.avg_conf
+    FROM (
+        SELECT COUNT(*) AS total_turns
+        FROM conversation_turns
+        WHERE session_id = :sid
+    ) AS t
+    LEFT JOIN (
+        SELECT
+            name,
+            COALESCE(MAX(NULLIF(category, '')), 'Skill') AS category,
+            COUNT(*) AS count,
+            AVG(confidence) AS avg_conf
+        FROM turn_skills
+        WHERE session_id = :sid
+        GROUP BY name
+    ) AS s ON 1 = 1
+    ORDER BY s.count DESC, s.avg_conf DESC, s.name
+    """
+)
+
+
+MAX_PAGE_SIZE = 200  # upper bound for /api/conversation?limit=
+
+# Lowercased catalog name / alias -> bit index of its SKILL_CONFIG entry
+_SKILL_INDEX: Dict[str, int] = {
+    key.lower(): i
+    for i, skill in enumerate(SKILL_CONFIG)
+    for key in [skill["name"]] + skill["aliases"]
+}
+_SKILL_KEYS: List[str] = [skill["name"].lower() for skill in SKILL_CONFIG]
+
+
+def skill_mask(skill_names: Iterable[str]) -> Tuple[int, Set[str]]:
+    """Encode catalog skills as a bitmask; also return lowercased names not in the catalog."""
+    mask = 0
+    other: Set[str] = set()
+    for name in skill_names:
+        key = name.lower()
+        idx = _SKILL_INDEX.get(key)
+        if idx is None:
+            other.add(key)
+        else:
+            mask |= 1 << idx
+    return mask, other
+
+
+def mask_to_names(mask: int) -> List[str]:
+    return [key for i, key in enumerate(_SKILL_KEYS) if mask >> i & 1]
 
-    if "React" in names and (("FastAPI" in names) or ("Node.js" in names) or ("Express" in names)):
-        roles.append("Full-Stack Developer")
 
-    if any(s in names for s in ["FastAPI", "Django", "Node.js", "Express", "REST API"]):
-        roles.append("Backend Engineer")
+# Compact skills_json entries: {"n": name, "c": confidence, "e": evidence}.
+# Category is implied by the catalog and only stored ("cat") when it differs.
+_SKILL_CATEGORY: Dict[str, str] = {skill["name"]: skill["category"] for skill in SKILL_CONFIG}
+EVIDENCE_MAX_CHARS = 64
 
-    if any(s in names for s in ["AWS", "Azure", "GCP", "Docker", "Kubernetes", "CI/CD", "GitHub Actions"]):
-        roles.append("DevOps / Cloud Engineer")
 
-    if any(s in names for s in ["Pandas", "NumPy", "SQL", "PostgreSQL", "MongoDB"]):
-        roles.append("Data Engineer / Data Analyst")
+def pack_skill(skill: Skill) -> Dict:
+    obj = {"n": skill.name, "c": skill.confidence, "e": (skill.evidence or "")[:EVIDENCE_MAX_CHARS]}
+    if skill.category != _SKILL_CATEGORY.get(skill.name):
+        obj["cat"] = skill.category
+    return obj
 
-    if any(s in names for s in ["LangChain", "ChromaDB"]):
-        roles.append("LLM / RAG Engineer")
 
-    # Deduplicate while preserving order
-    seen = set()
-    unique_roles: List[str] = []
-    for r in roles:
-        if r not in seen:
-            unique_roles.append(r)
-            seen.add(r)
-    return unique_roles
+def unpack_skill(obj: Dict) -> Dict:
+    """Expand a skills_json entry back to the Skill shape (as a plain dict)."""
+    if "n" not in obj:
+        return Skill(**obj).model_dump()  # rows written before skills_json was compacted
+    return {
+        "name": obj["n"],
+        "category": obj.get("cat", _SKILL_CATEGORY.get(obj["n"], "Skill")),
+        "confidence": obj.get("c", 0.0),
+        "evidence": obj.get("e", ""),
+    }
 
 
 # -------------------------
@@ -142,14 +204,15 @@ def infer_roles_from_skill_names(skill_names: List[str]) -> List[str]:
 # -------------------------
 
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(request: ChatRequest, db: Session = Depends(get_db)):
-    if not request.message.strip():
+async def chat(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    normalized = request.message.strip().lower()
+    if not normalized:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
     session_id = request.session_id or str(uuid.uuid4())
 
     try:
-        reply, skills_list = analyze_message(request.message)
+        reply, skills_list = await analyze_message(request.message, normalized=normalized)
     except Exception as e:
         # Log error and return friendly message
         print(f"Error during LLM/RAG: {e}")
@@ -171,101 +234,112 @@ def chat(request: ChatRequest, db: Session = Depends(get_db)):
         except Exception:
             continue
 
-    # Persist in DB
-    db_obj = ConversationTurn(
-        session_id=session_id,
-        user_message=request.message,
-        bot_response=reply,
-        skills_json=[s.dict() for s in skills_objs],
-    )
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    # Persist in DB: INSERT ... RETURNING gives id + timestamp in one round
+    # trip, then all skill rows go in as a single executemany.
+    turn_id, created_at = (
+        await db.execute(
+            insert(ConversationTurn)
+            .values(
+                session_id=session_id,
+                user_message=request.message,
+                bot_response=reply,
+                skills_json=[pack_skill(s) for s in skills_objs],
+            )
+            .returning(ConversationTurn.id, ConversationTurn.created_at)
+        )
+    ).one()
+    skill_rows = [
+        {
+            "turn_id": turn_id,
+            "session_id": session_id,
+            "name": s.name,
+            "category": s.category or "",
+            "confidence": s.confidence or 0.0,
+        }
+        for s in skills_objs
+        if s.name
+    ]
+    if skill_rows:
+        await db.execute(insert(TurnSkill), skill_rows)
+    await db.commit()
 
     return ChatResponse(
         session_id=session_id,
         reply=reply,
         skills=skills_objs,
-        timestamp=db_obj.created_at,
+        timestamp=created_at,
     )
 
 
-@app.get("/api/conversation/{session_id}", response_model=List[TurnOut])
-def get_conversation(session_id: str, db: Session = Depends(get_db)):
-    turns = (
-        db.query(ConversationTurn)
-        .filter(ConversationTurn.session_id == session_id)
-        .order_by(ConversationTurn.created_at.asc())
-        .all()
-    )
-    result: List[TurnOut] = []
-    for t in turns:
-        skills_data = t.skills_json or []
-        skills_objs = [Skill(**s) for s in skills_data]
-        result.append(
-            TurnOut(
-                user_message=t.user_message,
-                bot_response=t.bot_response,
-                skills=skills_objs,
-                created_at=t.created_at,
+@app.get("/api/conversation/{session_id}", response_model=ConversationPage)
+async def get_conversation(
+    session_id: str,
+    after_id: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    One page of turns in chronological order (keyset pagination on turn id).
+    Pass the returned next_after_id as after_id to get the next page; it is
+    null once the last page has been returned.
+    """
+    rows = (
+        await db.execute(
+            select(
+                ConversationTurn.id,
+                ConversationTurn.user_message,
+                ConversationTurn.bot_response,
+                ConversationTurn.skills_json,
+                ConversationTurn.created_at,
             )
+            .where(ConversationTurn.session_id == session_id, ConversationTurn.id > after_id)
+            .order_by(ConversationTurn.id.asc())
+            .limit(limit + 1)  # one extra row tells us whether another page exists
         )
-    return result
+    ).all()
+    turns = rows[:limit]
+    # Plain dicts; response_model serializes them via Pydantic's core.
+    return {
+        "turns": [
+            {
+                "user_message": t.user_message,
+                "bot_response": t.bot_response,
+                "skills": [unpack_skill(s) for s in t.skills_json or []],
+                "created_at": t.created_at,
+            }
+            for t in turns
+        ],
+        "next_after_id": turns[-1].id if len(rows) > limit else None,
+    }
 
 
 @app.get("/api/profile/{session_id}", response_model=ProfileResponse)
-def get_profile(session_id: str, db: Session = Depends(get_db)):
+async def get_profile(session_id: str, db: AsyncSession = Depends(get_db)):
     """
     Aggregate skills across all turns in this session and infer possible roles.
     """
-    turns = (
-        db.query(ConversationTurn)
-        .filter(ConversationTurn.session_id == session_id)
-        .all()
-    )
-    if not turns:
+    rows = (await db.execute(PROFILE_STATS_SQL, {"sid": session_id})).all()
+    total_turns = rows[0].total_turns
+    if not total_turns:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    skill_stats: Dict[str, Dict] = {}  # key = name
-
-    for t in turns:
-        skills = t.skills_json or []
-        for s in skills:
-            name = str(s.get("name", "")).strip()
-            if not name:
-                continue
-            category = str(s.get("category", "")).strip() or "Skill"
-            conf = float(s.get("confidence", 0.0))
-            if name not in skill_stats:
-                skill_stats[name] = {
-                    "name": name,
-                    "category": category,
-                    "count": 0,
-                    "sum_conf": 0.0,
-                }
-            skill_stats[name]["count"] += 1
-            skill_stats[name]["sum_conf"] += conf
-
-    skill_counts: List[SkillCount] = []
-    for info in skill_stats.values():
-        avg_conf = info["sum_conf"] / max(info["count"], 1)
-        skill_counts.append(
-            SkillCount(
-                name=info["name"],
-                category=info["category"],
-                count=info["count"],
-                avg_confidence=avg_conf,
-            )
+    # Already sorted by count desc, then avg_conf desc
+    skill_counts: List[SkillCount] = [
+        SkillCount(
+            name=r.name,
+            category=r.category,
+            count=r.count,
+            avg_confidence=r.avg_conf,
         )
-
-    # Sort by count desc, then avg_conf desc
-    skill_counts.sort(key=lambda s: (s.count, s.avg_confidence), reverse=True)
+        for r in rows
+        if r.name is not None
+    ]
 
     suggested_roles = infer_roles_from_skill_names([s.name for s in skill_counts])
 
     return ProfileResponse(
         session_id=session_id,
-        total_turns=len(turns),
+        total_turns=total_turns,
         total_skills=len(skill_counts),
         skills=skill_counts,
         suggested_roles=suggested_roles,
@@ -273,16 +347,21 @@ def get_profile(session_id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/api/match", response_model=MatchResult)
-def match_skills(request: MatchRequest):
+async def match_skills(request: MatchRequest):
     """
     Compare candidate skills vs job description skills and compute match score.
     """
-    if not request.candidate_text.strip() or not request.job_description.strip():
+    cand_normalized = request.candidate_text.strip().lower()
+    jd_normalized = request.job_description.strip().lower()
+    if not cand_normalized or not jd_normalized:
         raise HTTPException(status_code=400, detail="Both candidate_text and job_description are required.")
 
-    # Reuse analyze_message for both texts (LLM or fallback)
-    cand_reply, cand_skills_raw = analyze_message(request.candidate_text)
-    jd_reply, jd_skills_raw = analyze_message(request.job_description)
+    # Reuse analyze_message for both texts (LLM or fallback); they are
+    # independent, so run them concurrently.
+    (cand_reply, cand_skills_raw), (jd_reply, jd_skills_raw) = await asyncio.gather(
+        analyze_message(request.candidate_text, normalized=cand_normalized),
+        analyze_message(request.job_description, normalized=jd_normalized),
+    )
 
     cand_skills = [
         Skill(
@@ -306,16 +385,19 @@ def match_skills(request: MatchRequest):
         if s.get("name")
     ]
 
-    cand_set = {s.name.lower() for s in cand_skills}
-    jd_set = {s.name.lower() for s in jd_skills}
+    # Catalog skills become bits (set ops are int AND / AND-NOT); anything
+    # outside SKILL_CONFIG falls back to plain string sets.
+    cand_mask, cand_other = skill_mask(s.name for s in cand_skills)
+    jd_mask, jd_other = skill_mask(s.name for s in jd_skills)
 
-    matched = sorted({s for s in cand_set & jd_set})
-    missing = sorted({s for s in jd_set - cand_set})
-    extra = sorted({s for s in cand_set - jd_set})
+    matched = sorted(mask_to_names(cand_mask & jd_mask) + list(cand_other & jd_other))
+    missing = sorted(mask_to_names(jd_mask & ~cand_mask) + list(jd_other - cand_other))
+    extra = sorted(mask_to_names(cand_mask & ~jd_mask) + list(cand_other - jd_other))
 
     match_score = 0.0
-    if jd_set:
-        match_score = len(matched) / len(jd_set)
+    jd_total = bin(jd_mask).count("1") + len(jd_other)
+    if jd_total:
+        match_score = len(matched) / jd_total
 
     return MatchResult(
         match_score=match_score,
@@ -1,5 +1,5 @@
 import datetime as dt
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Index
 from sqlalchemy.dialects.sqlite import JSON
 
 from .db import Base
@@ -14,3 +14,18 @@ class ConversationTurn(Base):
     bot_response = Column(Text, nullable=False)
     skills_json = Column(JSON, nullable=False)  # list of skills stored as JSON
     created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
+
+
+class TurnSkill(Base):
+    """One row per skill per turn, so profile stats are a plain GROUP BY."""
+
+    __tablename__ = "turn_skills"
+    __table_args__ = (Index("ix_turn_skills_session_name", "session_id", "name"),)
+
+    id = Column(Integer, primary_key=True)
+    turn_id = Column(Integer, ForeignKey("conversation_turns.id"), nullable=False, index=True)
+    session_id = Column(String(64), nullable=False)
+    name = Column(String(128), nullable=False)
+    category = Column(String(128), nullable=False, default="")
+    confidence = Column(Float, nullable=False, default=0.0)
+    created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
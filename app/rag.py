@@ -1,14 +1,28 @@
+import asyncio
 import json
 import os
 import re
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, Tuple, Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows dev setups: single process, no file lock
+    fcntl = None
+
+import httpx
 from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+from .cache import EmbeddingCache, LRUCache, SimilarityCache, content_key
+from .roles import infer_roles_from_skill_names
 
 # -----------------------------------------------------------------------------
 # Paths for vector DB and knowledge base
@@ -17,6 +31,9 @@ from openai import OpenAI
 CHROMA_DIR = Path(__file__).parent.parent / "chroma_db"
 DATA_DIR = Path(__file__).parent / "data"
 KB_FILE = DATA_DIR / "skills_knowledge_base.md"
+EMBED_CACHE_FILE = CHROMA_DIR / "embed_cache.sqlite"
+KB_STAMP_FILE = CHROMA_DIR / "kb_mtime"  # KB mtime the Chroma index was built from
+BUILD_LOCK_FILE = CHROMA_DIR / ".build.lock"
 
 CHROMA_DIR.mkdir(parents=True, exist_ok=True)
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -25,19 +42,84 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 # OpenAI client (only used when OPENAI_API_KEY is set and use_llm=True)
 # -----------------------------------------------------------------------------
 
-_OPENAI_CLIENT: Optional[OpenAI] = None
+# Shared connection settings: HTTP/2 + a keep-alive pool so requests reuse
+# the TLS connection to the API instead of handshaking each time.
+OPENAI_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+OPENAI_HTTP_TIMEOUT = 30.0
+
+_OPENAI_CLIENT: Optional[AsyncOpenAI] = None
 
 
-def get_openai_client() -> OpenAI:
+def get_openai_client() -> AsyncOpenAI:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set")
     global _OPENAI_CLIENT
     if _OPENAI_CLIENT is None:
-        _OPENAI_CLIENT = OpenAI(api_key=api_key)
+        _OPENAI_CLIENT = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=OPENAI_HTTP_LIMITS,
+                timeout=OPENAI_HTTP_TIMEOUT,
+            ),
+        )
     return _OPENAI_CLIENT
 
 
+# ---------------------------------------------------------------------------
+# Embeddings memoized by content hash (in memory + on disk)
+# ---------------------------------------------------------------------------
+
+_EMBED_CACHE: Optional[EmbeddingCache] = None
+
+
+def get_embed_cache() -> EmbeddingCache:
+    global _EMBED_CACHE
+    if _EMBED_CACHE is None:
+        _EMBED_CACHE = EmbeddingCache(maxsize=4096, path=EMBED_CACHE_FILE)
+    return _EMBED_CACHE
+
+
+class CachedOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings that only calls the API for texts it has not seen."""
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> List[List[float]]:
+        cache = get_embed_cache()
+        keys = [content_key(self.model, t) for t in texts]
+        vectors: List[Optional[List[float]]] = [cache.get(k) for k in keys]
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = super().embed_documents([texts[i] for i in missing], chunk_size=chunk_size)
+            for i, v in zip(missing, fresh):
+                vectors[i] = v
+            cache.put_many([(keys[i], vectors[i]) for i in missing])
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+_EMBEDDINGS: Optional[CachedOpenAIEmbeddings] = None
+
+
+def get_embeddings() -> CachedOpenAIEmbeddings:
+    """Return a shared embeddings instance (vector store + query cache)."""
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        # Sync client: embedding calls run in worker threads (asyncio.to_thread).
+        _EMBEDDINGS = CachedOpenAIEmbeddings(
+            http_client=httpx.Client(
+                http2=True,
+                limits=OPENAI_HTTP_LIMITS,
+                timeout=OPENAI_HTTP_TIMEOUT,
+            ),
+        )
+    return _EMBEDDINGS
+
+
 # ---------------------------------------------------------------------------
 # Smarter fallback skill extractor (no external LLM, fully local)
 # ---------------------------------------------------------------------------
@@ -181,43 +263,63 @@ SKILL_CONFIG = [
 ]
 
 
-def fallback_extract_skills(message: str) -> List[Dict]:
+# alias -> (skill index, alias index); aliases are unique across SKILL_CONFIG
+_ALIAS_TO_SKILL: Dict[str, Tuple[int, int]] = {
+    alias.lower(): (skill_idx, alias_idx)
+    for skill_idx, skill in enumerate(SKILL_CONFIG)
+    for alias_idx, alias in enumerate(skill["aliases"])
+}
+
+# One alternation over every alias, in SKILL_CONFIG order so the first listed
+# alias of a skill wins (same evidence as testing each alias in turn).
+# Wrapped in a lookahead so matches can overlap ("node.js" also yields "js").
+_ALIAS_RE = re.compile(
+    r"(?=\b(" + "|".join(re.escape(a) for a in _ALIAS_TO_SKILL) + r")\b)"
+)
+
+
+def fallback_extract_skills(message: str, normalized: Optional[str] = None) -> List[Dict]:
     """
     Smarter keyword-based skill extraction:
     - uses aliases (python / py / python3, ml / machine learning)
     - uses regex word boundaries to avoid false matches
     - works even for short, inconsistent inputs like "py reactjs aws docker"
+    - scans the message once with a single precompiled alias pattern
+    Pass `normalized` (message.strip().lower()) to skip re-normalizing.
     """
-    text = message.lower()
-    found: Dict[str, Dict] = {}
-
-    for skill in SKILL_CONFIG:
-        name = skill["name"]
-        category = skill["category"]
-        for alias in skill["aliases"]:
-            alias = alias.lower()
-            pattern = r"\b" + re.escape(alias) + r"\b"
-            if re.search(pattern, text):
-                if name not in found:
-                    found[name] = {
-                        "name": name,
-                        "category": category,
-                        "confidence": 0.7,
-                        "evidence": alias,
-                    }
-                break
-
-    return list(found.values())
-
-
-def fallback_response(message: str, skills: List[Dict]) -> str:
+    text = normalized if normalized is not None else message.lower()
+    best_alias: Dict[int, int] = {}  # skill index -> first matching alias index
+
+    for m in _ALIAS_RE.finditer(text):
+        skill_idx, alias_idx = _ALIAS_TO_SKILL[m.group(1)]
+        if alias_idx < best_alias.get(skill_idx, alias_idx + 1):
+            best_alias[skill_idx] = alias_idx
+
+    found: List[Dict] = []
+    for skill_idx in sorted(best_alias):
+        skill = SKILL_CONFIG[skill_idx]
+        found.append(
+            {
+                "name": skill["name"],
+                "category": skill["category"],
+                "confidence": 0.7,
+                "evidence": skill["aliases"][best_alias[skill_idx]].lower(),
+            }
+        )
+
+    return found
+
+
+_GREETINGS = frozenset({"hi", "hello", "hey", "hii", "hey there", "hola"})
+
+
+def fallback_response(message: str, skills: List[Dict], normalized: Optional[str] = None) -> str:
     """
     Friendly, interactive response in fallback mode (no external LLM).
     """
-    text = message.strip().lower()
+    text = normalized if normalized is not None else message.strip().lower()
 
-    greetings = {"hi", "hello", "hey", "hii", "hey there", "hola"}
-    if not skills and any(g == text for g in greetings):
+    if not skills and text in _GREETINGS:
         return (
             "Hey! 👋 I'm your skill assistant.\n\n"
             "Tell me about your experience or paste a resume bullet, and I'll identify your key skills "
@@ -235,30 +337,7 @@ def fallback_response(message: str, skills: List[Dict]) -> str:
     skill_names = [s["name"] for s in skills]
     skill_list_str = ", ".join(skill_names)
 
-    suggested_roles: List[str] = []
-    names = set(skill_names)
-
-    if "React" in names and (("FastAPI" in names) or ("Node.js" in names) or ("Express" in names)):
-        suggested_roles.append("Full-Stack Developer")
-
-    if any(s in names for s in ["FastAPI", "Django", "Node.js", "Express", "SQL", "REST API"]):
-        suggested_roles.append("Backend Engineer")
-
-    if any(s in names for s in ["AWS", "Azure", "GCP", "Docker", "Kubernetes", "CI/CD", "GitHub Actions"]):
-        suggested_roles.append("DevOps / Cloud Engineer")
-
-    if any(s in names for s in ["Pandas", "NumPy", "SQL", "PostgreSQL", "MongoDB", "Data Science"]):
-        suggested_roles.append("Data Engineer / Data Analyst")
-
-    if any(s in names for s in ["LangChain", "ChromaDB", "Machine Learning"]):
-        suggested_roles.append("LLM / RAG Engineer")
-
-    seen = set()
-    unique_roles: List[str] = []
-    for r in suggested_roles:
-        if r not in seen:
-            unique_roles.append(r)
-            seen.add(r)
+    unique_roles = infer_roles_from_skill_names(skill_names)
 
     if unique_roles:
         roles_str = ", ".join(unique_roles)
@@ -332,6 +411,53 @@ def ensure_kb_file() -> None:
     )
 
 
+_KB_MTIME: float = 0.0
+_KB_TEXT: str = ""
+
+
+def ensure_kb_loaded() -> bool:
+    """
+    Keep the knowledge base text memoized in _KB_TEXT.
+    Re-reads the file only when its mtime changes; returns True if it did.
+    """
+    global _KB_MTIME, _KB_TEXT
+    ensure_kb_file()
+    mtime = KB_FILE.stat().st_mtime
+    if mtime == _KB_MTIME:
+        return False
+    _KB_TEXT = KB_FILE.read_text(encoding="utf-8").strip()
+    _KB_MTIME = mtime
+    return True
+
+
+def _chroma_index_exists() -> bool:
+    sidecars = {EMBED_CACHE_FILE, KB_STAMP_FILE, BUILD_LOCK_FILE}
+    return any(p not in sidecars for p in CHROMA_DIR.iterdir())
+
+
+@contextmanager
+def _build_lock() -> Iterator[None]:
+    """Exclusive cross-process lock on CHROMA_DIR (no-op where fcntl is missing)."""
+    with open(BUILD_LOCK_FILE, "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _chroma_index_is_current() -> bool:
+    try:
+        return float(KB_STAMP_FILE.read_text()) == _KB_MTIME
+    except (OSError, ValueError):
+        return False
+
+
+EMBED_BATCH_SIZE = 512  # texts per embeddings request when indexing the KB
+
+
 def build_vectorstore() -> Optional[Chroma]:
     """
     Build or load a Chroma vector store from the skills knowledge base
@@ -345,63 +471,135 @@ def build_vectorstore() -> Optional[Chroma]:
         # No key -> don't build vectorstore, run in fallback-only mode.
         return None
 
-    ensure_kb_file()
-
-    embeddings = OpenAIEmbeddings()
-
-    if any(CHROMA_DIR.iterdir()):
-        return Chroma(
+    ensure_kb_loaded()
+
+    embeddings = get_embeddings()
+
+    # Check / delete / re-add / stamp must not interleave across workers
+    # sharing CHROMA_DIR, so the whole sequence runs under a file lock.
+    with _build_lock():
+        if _chroma_index_exists():
+            existing = Chroma(
+                embedding_function=embeddings,
+                persist_directory=str(CHROMA_DIR),
+            )
+            # Reuse the persisted index (e.g. from another worker) unless the KB
+            # file changed since it was built.
+            if _chroma_index_is_current():
+                return existing
+            # The collection's HNSW segment directory is not removed by
+            # delete_collection; drop it so rebuilds do not pile up on disk.
+            old_segments = [p for p in CHROMA_DIR.iterdir() if p.is_dir()]
+            existing.delete_collection()
+            for path in old_segments:
+                shutil.rmtree(path, ignore_errors=True)
+
+        docs = [Document(page_content=_KB_TEXT)]
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=800,
+            chunk_overlap=100,
+            separators=["\n\n", "\n", ". ", " "],
+        )
+        split_docs = splitter.split_documents(docs)
+        if not split_docs:
+            split_docs = docs
+
+        # Embed all chunks up front in a few large requests, then hand Chroma the
+        # precomputed vectors so it does not embed them again.
+        texts = [d.page_content for d in split_docs]
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+
+        metadatas = [d.metadata for d in split_docs]
+        vectorstore = Chroma(
             embedding_function=embeddings,
             persist_directory=str(CHROMA_DIR),
         )
-
-    text = KB_FILE.read_text(encoding="utf-8").strip()
-    docs = [Document(page_content=text)]
-
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", " "],
-    )
-    split_docs = splitter.split_documents(docs)
-    if not split_docs:
-        split_docs = docs
-
-    vectorstore = Chroma.from_documents(
-        documents=split_docs,
-        embedding=embeddings,
-        persist_directory=str(CHROMA_DIR),
-    )
-    vectorstore.persist()
-    return vectorstore
+        vectorstore._collection.add(
+            ids=[str(uuid.uuid4()) for _ in texts],
+            embeddings=vectors,
+            documents=texts,
+            metadatas=metadatas if any(metadatas) else None,
+        )
+        vectorstore.persist()
+        KB_STAMP_FILE.write_text(repr(_KB_MTIME))
+        return vectorstore
 
 
 _VECTORSTORE: Optional[Chroma] = None
+_VECTORSTORE_LOCK = threading.Lock()
 
 
 def get_vectorstore() -> Optional[Chroma]:
-    """Return a singleton Chroma vector store instance or None."""
+    """
+    Return a singleton Chroma vector store instance or None.
+    Rebuilt when the knowledge base file changes on disk.
+    """
     global _VECTORSTORE
-    if _VECTORSTORE is None:
-        _VECTORSTORE = build_vectorstore()
-    return _VECTORSTORE
+    with _VECTORSTORE_LOCK:
+        if _VECTORSTORE is None or ensure_kb_loaded():
+            _VECTORSTORE = build_vectorstore()
+        return _VECTORSTORE
+
+
+class CachedRetriever:
+    """
+    Top-k retriever over a vector store with an approximate result cache:
+    queries whose embedding is close to an earlier one reuse its documents
+    instead of running another vector search.
+    """
+
+    def __init__(self, vectorstore: Chroma, k: int = 5, maxsize: int = 512, threshold: float = 0.9):
+        self.vectorstore = vectorstore
+        self.k = k
+        self._cache = SimilarityCache(maxsize=maxsize, threshold=threshold)
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        # Usually an embed-cache hit: analyze_message embedded this query already.
+        query_vec = get_embeddings().embed_query(query)
+        docs = self._cache.get(query_vec)
+        if docs is None:
+            docs = self.vectorstore.similarity_search_by_vector(query_vec, k=self.k)
+            self._cache.put(query_vec, docs)
+        return docs
+
+
+_RETRIEVER: Optional[CachedRetriever] = None
+
+
+def get_retriever() -> Optional[CachedRetriever]:
+    """Return a singleton CachedRetriever over the vector store, or None."""
+    global _RETRIEVER
+    vectorstore = get_vectorstore()
+    if vectorstore is None:
+        return None
+    if _RETRIEVER is None or _RETRIEVER.vectorstore is not vectorstore:
+        _RETRIEVER = CachedRetriever(vectorstore, k=5)
+    return _RETRIEVER
 
 
 # ---------------------------------------------------------------------------
 # OpenAI + (optional) RAG path
 # ---------------------------------------------------------------------------
 
-def llm_analyze_with_rag(message: str) -> Tuple[str, List[Dict]]:
+def retrieve_context(message: str) -> str:
+    """Return knowledge-base context for the message ("" without a vector store)."""
+    retriever = get_retriever()
+    if retriever is None:
+        return ""
+    docs = retriever.get_relevant_documents(message)
+    return "\n\n".join(d.page_content for d in docs)
+
+
+async def llm_analyze_with_rag(message: str) -> Tuple[str, List[Dict]]:
     """
     Use OpenAI Chat Completions + optional Chroma RAG to analyze the message.
     Returns (assistant_response, skills_list).
     """
-    context = ""
-    vectorstore = get_vectorstore()
-    if vectorstore is not None:
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-        docs = retriever.get_relevant_documents(message)
-        context = "\n\n".join(d.page_content for d in docs)
+    # Chroma + embeddings are sync; keep them off the event loop.
+    context = await asyncio.to_thread(retrieve_context, message)
 
     system_prompt = """
 You are an AI career and skills assistant that BOTH chats naturally and extracts skills.
@@ -436,13 +634,15 @@ VERY IMPORTANT:
     user_content = f"[CONTEXT]\n{context}\n\n[USER MESSAGE]\n{message}"
 
     client = get_openai_client()
-    completion = client.chat.completions.create(
+    completion = await client.chat.completions.create(
         model="gpt-4.1-mini",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content},
         ],
         temperature=0.2,
+        # JSON mode: the API guarantees a syntactically valid JSON object.
+        response_format={"type": "json_object"},
     )
 
     raw = completion.choices[0].message.content
@@ -464,7 +664,20 @@ VERY IMPORTANT:
 # Main analyze function (hybrid: OpenAI + fallback)
 # ---------------------------------------------------------------------------
 
-def analyze_message(message: str, use_llm: bool = False) -> Tuple[str, List[Dict]]:
+# Exact results keyed by (mode, message); paraphrases in LLM mode are matched
+# by query embedding.
+_ANALYSIS_CACHE = LRUCache(maxsize=1024)
+_SEMANTIC_CACHE = SimilarityCache(maxsize=256, threshold=0.95)
+
+
+def _copy_result(result: Tuple[str, List[Dict]]) -> Tuple[str, List[Dict]]:
+    reply, skills = result
+    return reply, [dict(s) for s in skills]
+
+
+async def analyze_message(
+    message: str, use_llm: bool = False, *, normalized: Optional[str] = None
+) -> Tuple[str, List[Dict]]:
     """
     Analyze the user message and return:
     - assistant_response: chatbot reply text
@@ -475,14 +688,34 @@ def analyze_message(message: str, use_llm: bool = False) -> Tuple[str, List[Dict
           Try OpenAI + (optional) RAG. On any error, fall back to local engine.
       - Otherwise:
           Use local smart fallback engine only.
+
+    `normalized` is message.strip().lower() if the caller already has it.
     """
-    if use_llm and os.getenv("OPENAI_API_KEY"):
+    if normalized is None:
+        normalized = message.strip().lower()
+    llm_mode = bool(use_llm and os.getenv("OPENAI_API_KEY"))
+    # The fallback engine only sees the normalized text, so key on that.
+    key = content_key("llm", message) if llm_mode else content_key("fallback", normalized)
+    cached = _ANALYSIS_CACHE.get(key)
+    if cached is not None:
+        return _copy_result(cached)
+
+    if llm_mode:
         try:
-            return llm_analyze_with_rag(message)
+            query_vec = await asyncio.to_thread(get_embeddings().embed_query, message)
+            cached = _SEMANTIC_CACHE.get(query_vec)
+            if cached is None:
+                cached = await llm_analyze_with_rag(message)
+                _SEMANTIC_CACHE.put(query_vec, cached)
+            _ANALYSIS_CACHE.put(key, cached)
+            return _copy_result(cached)
         except Exception as e:
             print(f"LLM/RAG failed, falling back to local engine: {e}")
 
     # Fallback-only path (also used when key not set or use_llm=False)
-    skills = fallback_extract_skills(message)
-    reply = fallback_response(message, skills)
-    return reply, skills
+    skills = fallback_extract_skills(message, normalized)
+    reply = fallback_response(message, skills, normalized)
+    if not llm_mode:
+        # Deterministic, so safe to cache; LLM failures are not cached.
+        _ANALYSIS_CACHE.put(key, (reply, skills))
+    return _copy_result((reply, skills))
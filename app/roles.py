@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# ---------------------------------------------------------------------------
+# Role inference rules (shared by the chat reply and the profile endpoint)
+# ---------------------------------------------------------------------------
+
+# (role, skills that must all be present, skills of which at least one must be)
+ROLE_RULES: List[Tuple[str, frozenset, frozenset]] = [
+    (
+        "Full-Stack Developer",
+        frozenset({"React"}),
+        frozenset({"FastAPI", "Node.js", "Express"}),
+    ),
+    (
+        "Backend Engineer",
+        frozenset(),
+        frozenset({"FastAPI", "Django", "Node.js", "Express", "SQL", "REST API"}),
+    ),
+    (
+        "DevOps / Cloud Engineer",
+        frozenset(),
+        frozenset({"AWS", "Azure", "GCP", "Docker", "Kubernetes", "CI/CD", "GitHub Actions"}),
+    ),
+    (
+        "Data Engineer / Data Analyst",
+        frozenset(),
+        frozenset({"Pandas", "NumPy", "SQL", "PostgreSQL", "MongoDB", "Data Science"}),
+    ),
+    (
+        "LLM / RAG Engineer",
+        frozenset(),
+        frozenset({"LangChain", "ChromaDB", "Machine Learning"}),
+    ),
+]
+
+
+@lru_cache(maxsize=512)
+def _infer_roles_cached(names: frozenset) -> Tuple[str, ...]:
+    return tuple(
+        role
+        for role, all_of, any_of in ROLE_RULES
+        if all_of <= names and names & any_of
+    )
+
+
+def infer_roles_from_skill_names(skill_names: Iterable[str]) -> List[str]:
+    """
+    Very simple heuristics to infer possible roles from skill names.
+    Memoized per distinct skill set (profiles change slowly between polls).
+    """
+    return list(_infer_roles_cached(frozenset(skill_names)))
@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiosqlite")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_python_m_app_db_creates_tables(tmp_path):
+    db_file = tmp_path / "skillbot.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{db_file}")
+
+    subprocess.run([sys.executable, "-m", "app.db"], cwd=ROOT, env=env, check=True)
+
+    with sqlite3.connect(db_file) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"conversation_turns", "turn_skills"} <= tables
+
+
+def test_python_m_app_db_backfills_legacy_turns_once(tmp_path):
+    db_file = tmp_path / "skillbot.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{db_file}")
+
+    # Database from before turn_skills existed: full-key skills_json rows.
+    with sqlite3.connect(db_file) as conn:
+        conn.execute(
+            "CREATE TABLE conversation_turns (id INTEGER PRIMARY KEY, session_id VARCHAR(64) NOT NULL, "
+            "user_message TEXT NOT NULL, bot_response TEXT NOT NULL, skills_json JSON NOT NULL, "
+            "created_at DATETIME NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO conversation_turns VALUES (1, 's1', 'hi', 'hello', ?, '2025-01-01 00:00:00')",
+            ('[{"name": "Python", "category": "Programming Language", "confidence": 0.7}, {"name": ""}]',),
+        )
+
+    for _ in range(2):
+        subprocess.run([sys.executable, "-m", "app.db"], cwd=ROOT, env=env, check=True)
+
+    with sqlite3.connect(db_file) as conn:
+        rows = conn.execute("SELECT turn_id, session_id, name, category, confidence FROM turn_skills").fetchall()
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(turn_skills)")}
+        user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    assert rows == [(1, "s1", "Python", "Programming Language", 0.7)]
+    assert "ix_turn_skills_turn_id" in indexes
+    assert user_version == 1